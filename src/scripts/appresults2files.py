@@ -26,13 +26,14 @@ from BaseSpacePy.model.QueryParameters import QueryParameters as qp
 from BaseSpacePy.api import BaseSpaceException
 import logging
 import time
+from progress import Progress
 
 class AppResults:
     
     logging.basicConfig()
 
     @staticmethod
-    def download(clientKey=None, clientSecret=None, accessToken=None, appResultId=None, fileNameRegexesInclude=list(), fileNameRegexesOmit=list(), outputDirectory='\.', createBsDir=True, force=False, numRetries=3):
+    def download(clientKey=None, clientSecret=None, accessToken=None, appResultId=None, fileNameRegexesInclude=list(), fileNameRegexesOmit=list(), outputDirectory='\.', createBsDir=True, force=False, numRetries=3, progressInterval=5.0, statusFile=None):
         '''
         Downloads App Result files.
 
@@ -49,6 +50,8 @@ class AppResults:
         :param createBsDir true to recreate the path structure within BaseSpace, false otherwise
         :param force use the force: overwrite existing files if true, false otherwise
         :param numRetries the number of retries for a single download API call
+        :param progressInterval the number of seconds between progress reports
+        :param statusFile the path to which the JSON progress status is written, or None to not write one
         '''
         appSessionId = ''
         apiServer = 'https://api.basespace.illumina.com/' # or 'https://api.cloud-hoth.illumina.com/'
@@ -93,35 +96,45 @@ class AppResults:
         filesToDownload = [f for f in filesToDownload if keepFile(str(f))]
 
         print "Will download %d files." % len(filesToDownload)
-        for i in range(len(filesToDownload)):
-            appResultFile = filesToDownload[i]
-            print 'Downloading (%d/%d): %s' % ((i+1), len(filesToDownload), str(appResultFile))
-            print "File Path: %s" % appResultFile.Path
-            if not options.dryRun:
-                outputPath = str(appResultFile.Path) 
-                if not createBsDir:
-                    outputPath = os.path.basename(outputPath)
-                if os.path.exists(outputPath):
-                    if force:
-                        print "Overwritting: %s" % outputPath
+        numBytes = sum([Progress.fileSize(f) for f in filesToDownload])
+        progress = Progress(len(filesToDownload), numBytes, interval=progressInterval, statusFile=statusFile)
+        if not options.dryRun:
+            progress.start()
+        completed = False
+        try:
+            for i in range(len(filesToDownload)):
+                appResultFile = filesToDownload[i]
+                progress.message('Downloading (%d/%d): %s' % ((i+1), len(filesToDownload), str(appResultFile)))
+                progress.message("File Path: %s" % appResultFile.Path)
+                if not options.dryRun:
+                    outputPath = str(appResultFile.Path) 
+                    if not createBsDir:
+                        outputPath = os.path.basename(outputPath)
+                    if os.path.exists(outputPath):
+                        if force:
+                            progress.message("Overwritting: %s" % outputPath)
+                        else:
+                            progress.message("Skipping existing file: %s" % outputPath)
+                            progress.skip(Progress.fileSize(appResultFile))
+                            continue
                     else:
-                        print "Skipping existing file: %s" % outputPath
-                        continue
-                else:
-                    print "Downloading to: %s" % outputPath
-                retryIdx = 0
-                retryException = None
-                while retryIdx < numRetries:
-                    try:
-                        appResultFile.downloadFile(myAPI, outputDirectory, createBsDir=createBsDir)
-                    except BaseSpaceException.ServerResponseException as e:
-                        retryIdx += 1
-                        time.sleep(sleepTime)
-                        retryException = e
-                    else:
-                        break
-                if retryIdx == numRetries:
-                    raise retryException
+                        progress.message("Downloading to: %s" % outputPath)
+                    retryIdx = 0
+                    retryException = None
+                    while retryIdx < numRetries:
+                        try:
+                            progress.download(myAPI, appResultFile, outputDirectory, createBsDir)
+                        except BaseSpaceException.ServerResponseException as e:
+                            retryIdx += 1
+                            time.sleep(sleepTime)
+                            retryException = e
+                        else:
+                            break
+                    if retryIdx == numRetries:
+                        raise retryException
+            completed = True
+        finally:
+            progress.stop(failed=not completed)
         print "Download complete."
 
 if __name__ == '__main__':
@@ -153,6 +166,8 @@ if __name__ == '__main__':
             dest='createBsDir', action='store_false', default=True)
     group.add_option('-f', '--force-overwrite', help='force overwrite if files are present', dest='force', action='store_true', default=False)
     group.add_option('-n', '--num-retries', help='the number of retries for a download API call', dest='numRetries', default=3)
+    group.add_option('-t', '--progress-interval', help='the number of seconds between progress reports', dest='progressInterval', type='float', default=5.0)
+    group.add_option('-u', '--status-file', help='write the progress status as JSON to this file (optional)', dest='statusFile', default=None)
     parser.add_option_group(group)
     
     options, args = parser.parse_args()
@@ -164,8 +179,17 @@ if __name__ == '__main__':
         print 'The App Result identifier (-i) option must be given.\n'
         parser.print_help()
         sys.exit(1)
+    if options.progressInterval <= 0:
+        print 'The progress interval (-t) must be greater than zero.\n'
+        parser.print_help()
+        sys.exit(1)
+    if None != options.statusFile and not os.path.isdir(os.path.dirname(os.path.abspath(options.statusFile))):
+        print 'The directory for the status file (-u) does not exist: %s\n' % options.statusFile
+        parser.print_help()
+        sys.exit(1)
 
     AppResults.download(options.clientKey, options.clientSecret, options.accessToken, \
             options.appResultId, options.fileNameRegexesInclude, options.fileNameRegexesOmit, \
             outputDirectory=options.outputDirectory, createBsDir=options.createBsDir, \
-            force=options.force, numRetries=options.numRetries)
+            force=options.force, numRetries=options.numRetries, \
+            progressInterval=options.progressInterval, statusFile=options.statusFile)
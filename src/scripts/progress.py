@@ -0,0 +1,320 @@
+################################################################################
+# Copyright 2017 Nils Homer
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import os, sys
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+
+class Progress:
+    '''
+    Tracks the bytes transferred across all active downloads of a job and
+    periodically reports the current and average rate, and the ETA.
+
+    The BaseSpace SDK does not report bytes as they are received, so the number of
+    bytes transferred for an active download is sampled from the size of its local
+    file.  Large files are downloaded in parts into a temporary directory (see
+    download()), and the size of the parts is sampled instead.  On a terminal a single
+    line is redrawn in place, otherwise a log line is written each interval.  The same
+    state is optionally written as JSON to a status file so that it may be inspected
+    by another process.
+    '''
+
+    MB = 1024.0 * 1024.0
+
+    # files of at least this many MB are downloaded in parts
+    MULTIPART_SIZE = 25
+
+    def __init__(self, numFiles, numBytes, interval=5.0, statusFile=None, stallTime=60.0, out=sys.stderr, clock=time.time):
+        '''
+        :param numFiles the total number of files to download
+        :param numBytes the total number of bytes to download
+        :param interval the number of seconds between reports, must be greater than zero
+        :param statusFile the path to which the JSON status is written, or None to not write one
+        :param stallTime the number of seconds without any new bytes after which a download is stalled
+        :param out the stream to which to report
+        :param clock the function returning the current time in seconds
+        '''
+        if interval <= 0:
+            raise ValueError('The progress interval must be greater than zero: %s' % str(interval))
+        self.numFiles = numFiles
+        self.numBytes = numBytes
+        self.interval = float(interval)
+        self.statusFile = statusFile
+        self.stallTime = stallTime
+        self.out = out
+        self.clock = clock
+        self.tty = hasattr(out, 'isatty') and out.isatty()
+        self.state = 'running'
+        self.doneFiles = 0
+        self.doneBytes = 0
+        self.unobservedBytes = 0 # bytes of completed downloads never sampled while in flight
+        self.active = {} # local path -> transfer
+        self.startTime = None
+        self.lastTime = None
+        self.lastBytes = 0
+        self.currentRate = 0.0
+        self.line = None # the progress line last drawn on a terminal
+        self.writeFailed = False
+        self.reportFailed = False
+        self.lock = threading.Lock()
+        self.outLock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def localPath(bsFile, outputDirectory, createBsDir):
+        ''' Returns the local path to which the SDK downloads the given BaseSpace file. '''
+        if createBsDir:
+            return os.path.join(outputDirectory, str(bsFile.Path))
+        return os.path.join(outputDirectory, str(bsFile.Name))
+
+    @staticmethod
+    def fileSize(bsFile):
+        ''' Returns the size in bytes of the given BaseSpace file, or zero if not known. '''
+        try:
+            return int(bsFile.Size)
+        except (AttributeError, TypeError, ValueError):
+            return 0
+
+    def start(self):
+        ''' Starts reporting in a background thread. '''
+        self.startTime = self.lastTime = self.clock()
+        self.thread = threading.Thread(target=self.__run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, failed=False):
+        '''
+        Stops reporting, and writes a final report.  Does nothing if reporting was not started.
+        Errors writing the final report are logged, so as not to hide why a download failed.
+
+        :param failed true if the job did not complete, false otherwise
+        '''
+        if None == self.startTime:
+            return
+        self.stopped.set()
+        if None != self.thread:
+            self.thread.join()
+            self.thread = None
+        self.state = 'failed' if failed else 'done'
+        self.report()
+        if self.tty:
+            self.__output(self.out, '\n')
+        self.line = None
+        self.startTime = None
+
+    def download(self, myAPI, bsFile, localDir, createBsDir):
+        '''
+        Downloads the given BaseSpace file while tracking its progress.
+
+        Files of at least MULTIPART_SIZE MB are downloaded with the SDK's multipart
+        download, which writes the parts into a temporary directory before joining them
+        into the local file.  The temporary directory is created in the local directory,
+        so that the parts can be sampled while in flight, and is removed afterwards.
+
+        :param myAPI the BaseSpace API
+        :param bsFile the BaseSpace file to download
+        :param localDir the local directory to which to download the file
+        :param createBsDir true to recreate the path structure within BaseSpace, false otherwise
+        '''
+        path = Progress.localPath(bsFile, localDir, createBsDir)
+        size = Progress.fileSize(bsFile)
+        if size < Progress.MULTIPART_SIZE * Progress.MB:
+            self.begin(path, str(bsFile), size)
+            bsFile.downloadFile(myAPI, localDir, createBsDir=createBsDir)
+        else:
+            if not os.path.isdir(localDir):
+                os.makedirs(localDir)
+            tempDir = tempfile.mkdtemp(prefix='.parts.', dir=localDir)
+            try:
+                self.begin(path, str(bsFile), size, tempDir=tempDir)
+                myAPI.multipartFileDownload(bsFile.Id, localDir, partSize=Progress.MULTIPART_SIZE, \
+                        createBsDir=createBsDir, tempDir=tempDir)
+            finally:
+                shutil.rmtree(tempDir, ignore_errors=True)
+        self.end(path)
+
+    def begin(self, path, name, size, tempDir=None):
+        '''
+        Adds an active download.
+
+        :param path the local path to which the file is downloaded
+        :param name the name of the file to report
+        :param size the expected size of the file in bytes
+        :param tempDir the directory into which the parts of the file are downloaded, or None if not downloaded in parts
+        '''
+        with self.lock:
+            # a file being overwritten counts as zero bytes until it is modified
+            self.active[path] = {'name' : name, 'size' : size, 'bytes' : 0, 'baseline' : self.__stat(path), \
+                    'tempDir' : tempDir, 'observed' : False, 'lastChange' : self.clock()}
+
+    def end(self, path):
+        ''' Completes an active download. '''
+        with self.lock:
+            transfer = self.active.pop(path)
+            numBytes = max(transfer['size'], self.__bytesOnDisk(path))
+            self.doneFiles += 1
+            self.doneBytes += numBytes
+            # bytes received since the last sample are kept out of the current rate, so as not to report a spike
+            self.unobservedBytes += numBytes - transfer['bytes']
+
+    def skip(self, size):
+        ''' Removes a file that will not be downloaded from the totals. '''
+        with self.lock:
+            self.numFiles -= 1
+            self.numBytes -= size
+
+    def message(self, line):
+        ''' Writes a line to the standard output without garbling the progress line. '''
+        with self.outLock:
+            if None != self.line:
+                self.__output(self.out, '\r\033[K')
+            self.__output(sys.stdout, line + '\n')
+            if None != self.line:
+                self.__output(self.out, self.line)
+
+    def report(self):
+        ''' Samples the active downloads and reports the current state. '''
+        status = self.__sample()
+        line = self.__format(status)
+        with self.outLock:
+            if self.tty:
+                self.line = '\r' + line + '\033[K'
+                self.__output(self.out, self.line)
+            else:
+                self.__output(self.out, line + '\n')
+        if None != self.statusFile:
+            self.__write(status)
+
+    def __run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def __output(self, stream, s):
+        try:
+            stream.write(s)
+            stream.flush()
+        except (IOError, OSError, ValueError) as e:
+            # warn once, and keep downloading (ex. the stream is a closed pipe)
+            if not self.reportFailed:
+                logging.warning('Could not report progress: %s' % str(e))
+            self.reportFailed = True
+
+    @staticmethod
+    def __stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime)
+        except OSError:
+            return None
+
+    @staticmethod
+    def __bytesOnDisk(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def __bytesInDirectory(directory):
+        numBytes = 0
+        for root, dirs, files in os.walk(directory):
+            for f in files:
+                numBytes += Progress.__bytesOnDisk(os.path.join(root, f))
+        return numBytes
+
+    def __sample(self):
+        with self.lock:
+            now = self.clock()
+            transfers = []
+            inFlight = 0
+            for path in sorted(self.active):
+                transfer = self.active[path]
+                st = self.__stat(path)
+                numBytes = 0
+                if None != st and st != transfer['baseline']:
+                    numBytes = st[0]
+                if None != transfer['tempDir']:
+                    numBytes += self.__bytesInDirectory(transfer['tempDir'])
+                if 0 < transfer['size']:
+                    numBytes = min(numBytes, transfer['size'])
+                if transfer['bytes'] < numBytes:
+                    transfer['bytes'] = numBytes
+                    transfer['observed'] = True
+                    transfer['lastChange'] = now
+                idle = now - transfer['lastChange']
+                inFlight += transfer['bytes']
+                transfers.append({'path' : path, 'name' : transfer['name'], 'bytes' : transfer['bytes'], \
+                        'size' : transfer['size'], 'idleSeconds' : round(idle, 1), 'observed' : transfer['observed'], \
+                        'stalled' : self.stallTime <= idle})
+            transferred = self.doneBytes + inFlight
+            sampled = transferred - self.unobservedBytes
+            if self.lastTime < now:
+                self.currentRate = max(0, sampled - self.lastBytes) / float(now - self.lastTime)
+            self.lastTime = now
+            self.lastBytes = sampled
+            elapsed = now - self.startTime
+            averageRate = transferred / float(elapsed) if 0 < elapsed else 0.0
+            eta = None
+            if 0 < averageRate:
+                eta = max(0, self.numBytes - transferred) / averageRate
+            return {'state' : self.state, 'time' : now, 'elapsedSeconds' : round(elapsed, 1), \
+                    'doneFiles' : self.doneFiles, 'numFiles' : self.numFiles, \
+                    'bytes' : transferred, 'numBytes' : self.numBytes, \
+                    'currentRate' : self.currentRate, 'averageRate' : averageRate, \
+                    'etaSeconds' : None if None == eta else round(eta, 1), \
+                    'transfers' : transfers}
+
+    @staticmethod
+    def __duration(seconds):
+        if None == seconds:
+            return '--:--:--'
+        seconds = int(seconds)
+        return '%d:%02d:%02d' % (seconds / 3600, (seconds % 3600) / 60, seconds % 60)
+
+    def __format(self, status):
+        percent = 100.0 * status['bytes'] / status['numBytes'] if 0 < status['numBytes'] else 0.0
+        line = 'Progress: %d/%d files, %.1f/%.1f MB (%.1f%%), %.2f MB/s current, %.2f MB/s average, ETA %s' % \
+                (status['doneFiles'], status['numFiles'], status['bytes'] / Progress.MB, status['numBytes'] / Progress.MB, \
+                percent, status['currentRate'] / Progress.MB, status['averageRate'] / Progress.MB, \
+                Progress.__duration(status['etaSeconds']))
+        stalled = [transfer['name'] + ('' if transfer['observed'] else ' (no data)') \
+                for transfer in status['transfers'] if transfer['stalled']]
+        line += ', %d active' % len(status['transfers'])
+        if stalled:
+            line += ', stalled: %s' % ', '.join(stalled)
+        if 'running' != status['state']:
+            line += ', %s' % status['state']
+        return line
+
+    def __write(self, status):
+        # write to a temporary file and rename so readers never see a partial file
+        tmpFile = self.statusFile + '.tmp'
+        try:
+            with open(tmpFile, 'w') as fh:
+                json.dump(status, fh, indent=2, sort_keys=True)
+            os.rename(tmpFile, self.statusFile)
+        except (IOError, OSError) as e:
+            # warn once per run of failures, and keep reporting
+            if not self.writeFailed:
+                logging.warning('Could not write the status file %s: %s' % (self.statusFile, str(e)))
+            self.writeFailed = True
+        else:
+            self.writeFailed = False
@@ -24,6 +24,7 @@ from urllib2 import Request, urlopen, URLError
 from BaseSpacePy.api.BaseSpaceAPI import BaseSpaceAPI
 from BaseSpacePy.model.QueryParameters import QueryParameters as qp
 import logging
+from progress import Progress
 
 class Runs:
     
@@ -34,7 +35,7 @@ class Runs:
         return myAPI.getRunFilesById(Id=runId, queryPars=qp({'Limit' : fileLimit}))
 
     @staticmethod
-    def download(clientKey=None, clientSecret=None, accessToken=None, runId=None, runName=None, outputDirectory='\.', createBsDir=True):
+    def download(clientKey=None, clientSecret=None, accessToken=None, runId=None, runName=None, outputDirectory='\.', createBsDir=True, progressInterval=5.0, statusFile=None):
         '''
         Downloads run-level files.
 
@@ -50,6 +51,8 @@ class Runs:
         :param runName the BaseSpace run experiment name
         :param outputDirectory the root output directory
         :param createBsDir true to recreate the path structure within BaseSpace, false otherwise
+        :param progressInterval the number of seconds between progress reports
+        :param statusFile the path to which the JSON progress status is written, or None to not write one
         '''
         appSessionId = ''
         apiServer = 'https://api.basespace.illumina.com/' # or 'https://api.cloud-hoth.illumina.com/'
@@ -88,16 +91,25 @@ class Runs:
                 sys.exit(1)
         
         numFiles = len(runFiles)
+        numBytes = sum([Progress.fileSize(runFile) for runFile in runFiles])
         print "Will download files from %d ." % numFiles
-        i = 0
-        for runFile in runFiles:
-            outDir = os.path.join(outputDirectory, expName)
-            print 'Downloading (%d/%d): %s' % ((i+1), numFiles, str())
-            print "BaseSpace File Path: %s" % runFile.Path
-            print "Destination File Path: %s" % os.path.join(outDir, runFile.Name)
-            if not options.dryRun:
-                runFile.downloadFile(myAPI, outDir, createBsDir=createBsDir)
-            i = i + 1
+        progress = Progress(numFiles, numBytes, interval=progressInterval, statusFile=statusFile)
+        if not options.dryRun:
+            progress.start()
+        completed = False
+        try:
+            i = 0
+            for runFile in runFiles:
+                outDir = os.path.join(outputDirectory, expName)
+                progress.message('Downloading (%d/%d): %s' % ((i+1), numFiles, str()))
+                progress.message("BaseSpace File Path: %s" % runFile.Path)
+                progress.message("Destination File Path: %s" % os.path.join(outDir, runFile.Name))
+                if not options.dryRun:
+                    progress.download(myAPI, runFile, outDir, createBsDir)
+                i = i + 1
+            completed = True
+        finally:
+            progress.stop(failed=not completed)
         print "Download complete."
 
 if __name__ == '__main__':
@@ -124,6 +136,8 @@ if __name__ == '__main__':
     group = OptionGroup(parser, "Miscellaneous options")
     group.add_option('-d', '--dry-run', help='dry run; do not download the files', dest='dryRun', action='store_true', default=False)
     group.add_option('-o', '--output-directory', help='the output directory', dest='outputDirectory', default='./')
+    group.add_option('-t', '--progress-interval', help='the number of seconds between progress reports', dest='progressInterval', type='float', default=5.0)
+    group.add_option('-u', '--status-file', help='write the progress status as JSON to this file (optional)', dest='statusFile', default=None)
     parser.add_option_group(group)
     
     if len(sys.argv[1:]) < 1:
@@ -143,10 +157,20 @@ if __name__ == '__main__':
         print 'Both -p or -x may not be given together.\n'
         parser.print_help()
         sys.exit(1)
+    if options.progressInterval <= 0:
+        print 'The progress interval (-t) must be greater than zero.\n'
+        parser.print_help()
+        sys.exit(1)
+    if None != options.statusFile and not os.path.isdir(os.path.dirname(os.path.abspath(options.statusFile))):
+        print 'The directory for the status file (-u) does not exist: %s\n' % options.statusFile
+        parser.print_help()
+        sys.exit(1)
 
     Runs.download(options.clientKey, \
             options.clientSecret, \
             options.accessToken, \
             runId=options.runId, \
             runName=options.runName, \
-            outputDirectory=options.outputDirectory)
+            outputDirectory=options.outputDirectory, \
+            progressInterval=options.progressInterval, \
+            statusFile=options.statusFile)
@@ -24,6 +24,7 @@ from urllib2 import Request, urlopen, URLError
 from BaseSpacePy.api.BaseSpaceAPI import BaseSpaceAPI
 from BaseSpacePy.model.QueryParameters import QueryParameters as qp
 import logging
+from progress import Progress
 
 class Samples:
     
@@ -43,7 +44,7 @@ class Samples:
         return sampleToFiles
 
     @staticmethod
-    def download(clientKey=None, clientSecret=None, accessToken=None, sampleId=None, projectId=None, sampleName=None, projectName=None, outputDirectory='\.', createBsDir=True):
+    def download(clientKey=None, clientSecret=None, accessToken=None, sampleId=None, projectId=None, sampleName=None, projectName=None, outputDirectory='\.', createBsDir=True, progressInterval=5.0, statusFile=None):
         '''
         Downloads sample-level files.
 
@@ -68,6 +69,8 @@ class Samples:
         :param projectName the BaseSpace project name
         :param outputDirectory the root output directory
         :param createBsDir true to recreate the path structure within BaseSpace, false otherwise
+        :param progressInterval the number of seconds between progress reports
+        :param statusFile the path to which the JSON progress status is written, or None to not write one
         '''
         appSessionId = ''
         apiServer = 'https://api.basespace.illumina.com/' # or 'https://api.cloud-hoth.illumina.com/'
@@ -106,20 +109,29 @@ class Samples:
                     break
                 offset += projectLimit
         numFiles = sum([len(sampleToFiles[sampleId]) for sampleId in sampleToFiles])
+        numBytes = sum([Progress.fileSize(sampleFile) for sampleId in sampleToFiles for sampleFile in sampleToFiles[sampleId]])
         print "Will download files from %d ." % numFiles
-        i = 0
-        for sampleId in sampleToFiles:
-            for sampleFile in sampleToFiles[sampleId]:
-                print 'Downloading (%d/%d): %s' % ((i+1), numFiles, str(sampleFile))
-                print "BaseSpace File Path: %s" % sampleFile.Path
-                print "Sample Id: %s" % sampleId
-                if not options.dryRun:
-                    if createBsDir:
-                        sampleOutputDirectory = os.path.join(outputDirectory, sampleId)
-                    else:
-                        sampleOutputDirectory = outputDirectory
-                    sampleFile.downloadFile(myAPI, sampleOutputDirectory, createBsDir=createBsDir)
-                i = i + 1
+        progress = Progress(numFiles, numBytes, interval=progressInterval, statusFile=statusFile)
+        if not options.dryRun:
+            progress.start()
+        completed = False
+        try:
+            i = 0
+            for sampleId in sampleToFiles:
+                for sampleFile in sampleToFiles[sampleId]:
+                    progress.message('Downloading (%d/%d): %s' % ((i+1), numFiles, str(sampleFile)))
+                    progress.message("BaseSpace File Path: %s" % sampleFile.Path)
+                    progress.message("Sample Id: %s" % sampleId)
+                    if not options.dryRun:
+                        if createBsDir:
+                            sampleOutputDirectory = os.path.join(outputDirectory, sampleId)
+                        else:
+                            sampleOutputDirectory = outputDirectory
+                        progress.download(myAPI, sampleFile, sampleOutputDirectory, createBsDir)
+                    i = i + 1
+            completed = True
+        finally:
+            progress.stop(failed=not completed)
         print "Download complete."
 
 if __name__ == '__main__':
@@ -150,6 +162,8 @@ if __name__ == '__main__':
     group.add_option('-o', '--output-directory', help='the output directory', dest='outputDirectory', default='./')
     group.add_option('-b', '--create-basespace-directory-structure', help='recreate the basespace directory structure in the output directory', \
             dest='createBsDir', action='store_false', default=True)
+    group.add_option('-t', '--progress-interval', help='the number of seconds between progress reports', dest='progressInterval', type='float', default=5.0)
+    group.add_option('-u', '--status-file', help='write the progress status as JSON to this file (optional)', dest='statusFile', default=None)
     parser.add_option_group(group)
     
     if len(sys.argv[1:]) < 1:
@@ -173,8 +187,17 @@ if __name__ == '__main__':
         print 'Both -p or -x may not be given together.\n'
         parser.print_help()
         sys.exit(1)
+    if options.progressInterval <= 0:
+        print 'The progress interval (-t) must be greater than zero.\n'
+        parser.print_help()
+        sys.exit(1)
+    if None != options.statusFile and not os.path.isdir(os.path.dirname(os.path.abspath(options.statusFile))):
+        print 'The directory for the status file (-u) does not exist: %s\n' % options.statusFile
+        parser.print_help()
+        sys.exit(1)
 
     Samples.download(options.clientKey, options.clientSecret, options.accessToken, \
             sampleId=options.sampleId, projectId=options.projectId, \
             sampleName=options.sampleName, projectName=options.projectName, \
-            outputDirectory=options.outputDirectory, createBsDir=options.createBsDir)
+            outputDirectory=options.outputDirectory, createBsDir=options.createBsDir, \
+            progressInterval=options.progressInterval, statusFile=options.statusFile)
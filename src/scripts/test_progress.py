@@ -0,0 +1,273 @@
+################################################################################
+# Copyright 2017 Nils Homer
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import os, sys
+import json
+import logging
+import shutil
+import tempfile
+import unittest
+from progress import Progress
+
+MB = 1024 * 1024
+
+class FakeOut:
+    ''' Collects the lines reported by Progress. '''
+    def __init__(self, tty=False):
+        self.lines = []
+        self.tty = tty
+    def write(self, s):
+        self.lines.append(s)
+    def flush(self):
+        pass
+    def isatty(self):
+        return self.tty
+
+class BrokenOut:
+    ''' A stream whose reader has gone away. '''
+    def write(self, s):
+        raise IOError('Broken pipe')
+    def flush(self):
+        pass
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+    def __call__(self):
+        return self.now
+
+class FakeFile:
+    ''' A BaseSpace file whose download writes the local file. '''
+    def __init__(self, name, size):
+        self.Id = name
+        self.Name = name
+        self.Path = name
+        self.Size = size
+    def __str__(self):
+        return self.Name
+    def downloadFile(self, api, localDir, createBsDir=False):
+        truncate(os.path.join(localDir, self.Name), self.Size)
+
+class FakeAPI:
+    ''' Downloads a file in two parts, calling back after the first. '''
+    def __init__(self, bsFile, callback):
+        self.bsFile = bsFile
+        self.callback = callback
+    def multipartFileDownload(self, Id, localDir, partSize=25, createBsDir=False, tempDir=''):
+        partDir = tempfile.mkdtemp(dir=tempDir)
+        truncate(os.path.join(partDir, 'part.1'), self.bsFile.Size // 2)
+        self.callback()
+        truncate(os.path.join(localDir, self.bsFile.Name), self.bsFile.Size)
+
+def truncate(path, numBytes):
+    with open(path, 'wb') as fh:
+        fh.truncate(numBytes)
+
+class ProgressTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.out = FakeOut()
+        self.clock = FakeClock()
+        self.statusFile = os.path.join(self.dir, 'status.json')
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.warnings = []
+        self.patch(logging, 'warning', self.warnings.append)
+
+    def patch(self, obj, name, value):
+        self.addCleanup(setattr, obj, name, getattr(obj, name))
+        setattr(obj, name, value)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def writeFile(self, name, numBytes):
+        with open(self.path(name), 'wb') as fh:
+            fh.write(b'x' * numBytes)
+
+    def progress(self, numFiles, numBytes, **kwargs):
+        # a long interval so only explicit reports are made
+        kwargs.setdefault('statusFile', self.statusFile)
+        kwargs.setdefault('out', self.out)
+        progress = Progress(numFiles, numBytes, interval=1000, clock=self.clock, **kwargs)
+        progress.start()
+        self.addCleanup(progress.stop)
+        return progress
+
+    def status(self):
+        with open(self.statusFile) as fh:
+            return json.load(fh)
+
+    def test_rate_and_eta(self):
+        progress = self.progress(2, 4 * MB)
+        progress.begin(self.path('a'), 'a', 2 * MB)
+        self.writeFile('a', MB)
+        self.clock.now += 2
+        progress.report()
+        status = self.status()
+        self.assertEqual('running', status['state'])
+        self.assertEqual(MB, status['bytes'])
+        self.assertEqual(MB / 2.0, status['averageRate'])
+        self.assertEqual(MB / 2.0, status['currentRate'])
+        self.assertEqual(6.0, status['etaSeconds'])
+        self.assertTrue(self.out.lines[-1].startswith('Progress: 0/2 files, 1.0/4.0 MB (25.0%), 0.50 MB/s current'))
+
+        # no new bytes since the last report
+        self.clock.now += 2
+        progress.report()
+        status = self.status()
+        self.assertEqual(0.0, status['currentRate'])
+        self.assertEqual(MB / 4.0, status['averageRate'])
+
+        self.writeFile('a', 2 * MB)
+        progress.end(self.path('a'))
+        self.clock.now += 4
+        progress.report()
+        status = self.status()
+        self.assertEqual(1, status['doneFiles'])
+        self.assertEqual(2 * MB, status['bytes'])
+        self.assertEqual([], status['transfers'])
+
+    def test_end_of_unobserved_download(self):
+        progress = self.progress(1, 2 * MB)
+        progress.begin(self.path('a'), 'a', 2 * MB)
+        self.writeFile('a', 2 * MB)
+        progress.end(self.path('a'))
+        self.clock.now += 1
+        progress.stop()
+        status = self.status()
+        # counted in the average, but not as a spike in the current rate
+        self.assertEqual(2 * MB, status['bytes'])
+        self.assertEqual(2.0 * MB, status['averageRate'])
+        self.assertEqual(0.0, status['currentRate'])
+
+    def test_skip(self):
+        progress = self.progress(3, 6 * MB)
+        progress.skip(2 * MB)
+        progress.report()
+        status = self.status()
+        self.assertEqual(2, status['numFiles'])
+        self.assertEqual(4 * MB, status['numBytes'])
+        self.assertEqual(None, status['etaSeconds'])
+
+    def test_stalled(self):
+        progress = self.progress(2, 2 * MB, stallTime=10.0)
+        progress.begin(self.path('a'), 'a', MB)
+        progress.begin(self.path('b'), 'b', MB)
+        self.clock.now += 5
+        self.writeFile('a', MB // 2)
+        progress.report()
+        self.assertEqual([False, False], [transfer['stalled'] for transfer in self.status()['transfers']])
+
+        # never receiving any bytes is a stall too
+        self.clock.now += 6
+        progress.report()
+        transfers = self.status()['transfers']
+        self.assertEqual(['a', 'b'], [transfer['name'] for transfer in transfers])
+        self.assertEqual([True, False], [transfer['observed'] for transfer in transfers])
+        self.assertEqual([False, True], [transfer['stalled'] for transfer in transfers])
+        self.assertTrue(self.out.lines[-1].endswith(', 2 active, stalled: b (no data)\n'))
+
+        self.clock.now += 5
+        progress.report()
+        self.assertTrue(self.out.lines[-1].endswith(', 2 active, stalled: a, b (no data)\n'))
+
+    def test_overwrite_counts_from_zero(self):
+        self.writeFile('a', MB)
+        progress = self.progress(1, MB)
+        progress.begin(self.path('a'), 'a', MB)
+        progress.report()
+        self.assertEqual(0, self.status()['bytes'])
+
+    def test_download(self):
+        progress = self.progress(1, MB)
+        progress.download(None, FakeFile('a', MB), self.dir, False)
+        progress.report()
+        status = self.status()
+        self.assertEqual(1, status['doneFiles'])
+        self.assertEqual(MB, status['bytes'])
+
+    def test_multipart_download(self):
+        size = Progress.MULTIPART_SIZE * MB
+        bsFile = FakeFile('a', size)
+        progress = self.progress(1, size)
+        statuses = []
+        def callback():
+            self.clock.now += 1
+            progress.report()
+            statuses.append(self.status())
+        progress.download(FakeAPI(bsFile, callback), bsFile, self.dir, False)
+        # the parts are sampled while in flight
+        self.assertEqual(size // 2, statuses[0]['bytes'])
+        self.assertEqual(size // 2, statuses[0]['currentRate'])
+        self.assertTrue(statuses[0]['transfers'][0]['observed'])
+        self.assertEqual(sorted(['a', 'status.json']), sorted(os.listdir(self.dir)))
+        progress.report()
+        self.assertEqual(size, self.status()['bytes'])
+
+    def test_state_and_atomic_write(self):
+        progress = self.progress(1, MB)
+        progress.report()
+        self.assertEqual(['status.json'], os.listdir(self.dir))
+        progress.stop()
+        self.assertEqual('done', self.status()['state'])
+        self.assertTrue(self.out.lines[-1].endswith(', done\n'))
+
+        progress = self.progress(1, MB)
+        progress.stop(failed=True)
+        self.assertEqual('failed', self.status()['state'])
+
+    def test_status_write_failure(self):
+        progress = self.progress(1, MB, statusFile=self.path('missing/status.json'))
+        progress.report()
+        progress.report()
+        progress.stop()
+        self.assertEqual(1, len(self.warnings))
+        self.assertTrue(self.warnings[0].startswith('Could not write the status file'))
+        self.assertTrue(self.out.lines[-1].endswith(', done\n'))
+
+    def test_report_failure(self):
+        progress = self.progress(1, MB, out=BrokenOut())
+        progress.report()
+        progress.stop(failed=True)
+        self.assertEqual(1, len(self.warnings))
+        self.assertTrue(self.warnings[0].startswith('Could not report progress'))
+        self.assertEqual('failed', self.status()['state'])
+
+    def test_message(self):
+        stdout = FakeOut()
+        self.patch(sys, 'stdout', stdout)
+        self.out.tty = True
+        progress = self.progress(1, MB)
+        progress.report()
+        line = self.out.lines[-1]
+        self.assertTrue(line.startswith('\rProgress: '))
+        progress.message('Downloading (1/1): a')
+        # the progress line is cleared, and redrawn after the message
+        self.assertEqual(['\r\033[K', line], self.out.lines[-2:])
+        self.assertEqual(['Downloading (1/1): a\n'], stdout.lines)
+
+    def test_stop_without_start(self):
+        Progress(1, MB, statusFile=self.statusFile, out=self.out).stop()
+        self.assertEqual([], self.out.lines)
+        self.assertFalse(os.path.exists(self.statusFile))
+
+    def test_interval(self):
+        self.assertRaises(ValueError, Progress, 1, MB, interval=0)
+        self.assertRaises(ValueError, Progress, 1, MB, interval=-1)
+
+if __name__ == '__main__':
+    unittest.main()